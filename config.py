@@ -4,23 +4,49 @@ Manages environment variables, database settings, and LLM parameters
 """
 
 import os
-from typing import Dict, Any, Optional
+from types import MappingProxyType
+from typing import Dict, Any, Mapping, Optional
 from dataclasses import dataclass
-from dotenv import load_dotenv
+from dotenv import dotenv_values
 
 ##
-# Load environment variables from .env file
-load_dotenv()
+# Parse the .env file once into a private snapshot instead of writing it into the
+# process environment. Real environment variables still win, like load_dotenv() did.
+_E: Dict[str, str] = {
+    **{k: v for k, v in dotenv_values().items() if v is not None},
+    **os.environ,
+}
+
+def _env(name: str, default: Optional[str] = None) -> Optional[str]:
+    """Get a string environment variable"""
+    return _E.get(name, default)
+
+def _env_int(name: str, default: int) -> int:
+    """Get an integer environment variable"""
+    value = _E.get(name)
+    return int(value) if value is not None else default
 
-@dataclass
+def _env_float(name: str, default: float) -> float:
+    """Get a float environment variable"""
+    value = _E.get(name)
+    return float(value) if value is not None else default
+
+def _env_bool(name: str, default: bool) -> bool:
+    """Get a boolean environment variable ("true"/"false")"""
+    value = _E.get(name)
+    return value.lower() == "true" if value is not None else default
+
+@dataclass(frozen=True, slots=True)
 class DatabaseConfig:
     """MongoDB database configuration"""
     connection_string: str 
     database_name: str
     timeout_ms: int = 5000
     max_pool_size: int = 50
+    min_pool_size: int = 2
+    heartbeat_frequency_ms: int = 10000
 
-@dataclass  
+@dataclass(frozen=True, slots=True)
 class LLMConfig:
     """LLM (OpenAI) configuration"""
     api_key: str
@@ -28,26 +54,44 @@ class LLMConfig:
     temperature: float = 0.1
     max_tokens: int = 2000
     timeout: int = 30
+    insight_model: str = "gpt-4o-mini"
+    base_url: Optional[str] = None
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class AgentConfig:
     """Agent behavior configuration"""
     max_conversation_history: int = 20
     max_query_results: int = 50
     enable_streaming: bool = True
     debug_mode: bool = False
+    schema_cache_ttl_s: int = 86400
+    refresh_schema: bool = False
+    latency_mode: bool = False
 
 class Config:
     """Main configuration class"""
 
     def __init__(self):
-        self.database = self._get_database_config()
-        self.llm = self._get_llm_config() 
-        self.agent = self._get_agent_config()
+        # Check every section before failing so all config problems show up in one run
+        errors = []
+        for attr, getter in (("database", self._get_database_config),
+                             ("llm", self._get_llm_config),
+                             ("agent", self._get_agent_config)):
+            try:
+                setattr(self, attr, getter())
+            except ValueError as e:
+                errors.append(f"[{attr}] {e}")
+
+        # The latency hint is a gateway-specific field, api.openai.com rejects it
+        if not errors and self.agent.latency_mode and not self.llm.base_url:
+            errors.append("[agent] LATENCY_MODE requires OPENAI_BASE_URL pointing at a gateway that supports it")
+
+        if errors:
+            raise ValueError("\n".join(errors))
 
     def _get_database_config(self) -> DatabaseConfig:
         """Get database configuration from environment variables"""
-        connection_string = os.getenv("MONGODB_CONNECTION_STRING")
+        connection_string = _env("MONGODB_CONNECTION_STRING")
         if not connection_string:
             # Default connection string for local development. Dunno, given on the web
             connection_string = "mongodb://localhost:27017/"
@@ -55,14 +99,16 @@ class Config:
 
         return DatabaseConfig(
             connection_string=connection_string,
-            database_name=os.getenv("MONGODB_DATABASE", "sample_analytics"),
-            timeout_ms=int(os.getenv("MONGODB_TIMEOUT_MS", "5000")),
-            max_pool_size=int(os.getenv("MONGODB_MAX_POOL_SIZE", "50"))
+            database_name=_env("MONGODB_DATABASE", "sample_analytics"),
+            timeout_ms=_env_int("MONGODB_TIMEOUT_MS", 5000),
+            max_pool_size=_env_int("MONGODB_MAX_POOL_SIZE", 50),
+            min_pool_size=_env_int("MONGODB_MIN_POOL_SIZE", 2),
+            heartbeat_frequency_ms=_env_int("MONGODB_HEARTBEAT_MS", 10000)
         )
 
     def _get_llm_config(self) -> LLMConfig:
         """Get LLM configuration from environment variables"""
-        api_key = os.getenv('OPENAI_API_KEY')
+        api_key = _env('OPENAI_API_KEY')
 
         if not api_key:
             raise ValueError("OPENAI_API_KEY environment variable is required")
@@ -74,118 +120,161 @@ class Config:
             #"model": os.getenv("OPENAI_MODEL", "gpt-3.5-turbo"),
             #"api_key": api_key,
             #}],
-            model=os.getenv("OPENAI_MODEL", "gpt-3.5-turbo"),            
-            temperature=float(os.getenv("OPENAI_TEMPERATURE", "0.1")),
-            max_tokens=int(os.getenv("OPENAI_MAX_TOKENS","2000")),
-            timeout=int(os.getenv("OPENAI_TIMEOUT", "30"))
+            model=_env("OPENAI_MODEL", "gpt-3.5-turbo"),            
+            temperature=_env_float("OPENAI_TEMPERATURE", 0.1),
+            max_tokens=_env_int("OPENAI_MAX_TOKENS", 2000),
+            timeout=_env_int("OPENAI_TIMEOUT", 30),
+            insight_model=_env("OPENAI_INSIGHT_MODEL", "gpt-4o-mini"),
+            # None means the regular api.openai.com endpoint
+            base_url=_env("OPENAI_BASE_URL") or None
         )
 
     def _get_agent_config(self) -> AgentConfig:
         """Get agent configuration from environment variables"""
         return AgentConfig(
-            max_conversation_history=int(os.getenv("MAX_CONVERSATION_HISTORY", "20")),
-            max_query_results=int(os.getenv("MAX_QUERY_RESULTS", "50")),
-            enable_streaming=os.getenv("ENABLE_STREAMING", "true").lower() == "true",
-            debug_mode=os.getenv("DEBUG_MODE", "false").lower() == "true"
+            max_conversation_history=_env_int("MAX_CONVERSATION_HISTORY", 20),
+            max_query_results=_env_int("MAX_QUERY_RESULTS", 50),
+            enable_streaming=_env_bool("ENABLE_STREAMING", True),
+            debug_mode=_env_bool("DEBUG_MODE", False),
+            schema_cache_ttl_s=_env_int("SCHEMA_CACHE_TTL_S", 86400),
+            refresh_schema=_env_bool("REFRESH_SCHEMA", False),
+            latency_mode=_env_bool("LATENCY_MODE", False)
         )
 
-# Global configuration instance
-config = Config()
-
-# Sample analytics database schema metadata
-SAMPLE_ANALYTICS_SCHEMA = {
-    "accounts": {
-        "description": "Customer account information including credit limits and products",
-        "fields": {
-            "_id": {"type": "ObjectId", "description": "Unique account identifier"},
-            "account_id": {"type": "int", "description": "Account ID number"},
-            "limit": {"type": "int", "description": "Credit limit for the account"},
-            "products": {"type": "array", "description": "Array of financial products (CurrencyService, Derivatives, InvestmentStock, etc.)"}
-        },
-        "relationships": {
-            "customers": "Referenced by customers.accounts array"
-        }
-    },
-    "customers": {
-        "description": "Customer profile information and contact details",
-        "fields": {
-            "_id": {"type": "ObjectId", "description": "Unique customer identifier"},
-            "username": {"type": "string", "description": "Customer username"},
-            "name": {"type": "string", "description": "Customer full name"},
-            "address": {"type": "string", "description": "Customer address"},
-            "birthdate": {"type": "date", "description": "Customer birth date"},
-            "email": {"type": "string", "description": "Customer email address"},
-            "accounts": {"type": "array", "description": "Array of account IDs belonging to this customer"},
-            "tier_and_details": {"type": "object", "description": "Customer tier information and additional details"}
+def _freeze(value: Any) -> Any:
+    """Recursively wrap dicts in read-only MappingProxyType views"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    return value
+
+def _build_schema() -> Mapping[str, Any]:
+    """Sample analytics database schema metadata (read-only)"""
+    return _freeze({
+        "accounts": {
+            "description": "Customer account information including credit limits and products",
+            "fields": {
+                "_id": {"type": "ObjectId", "description": "Unique account identifier"},
+                "account_id": {"type": "int", "description": "Account ID number"},
+                "limit": {"type": "int", "description": "Credit limit for the account"},
+                "products": {"type": "array", "description": "Array of financial products (CurrencyService, Derivatives, InvestmentStock, etc.)"}
+            },
+            "relationships": {
+                "customers": "Referenced by customers.accounts array"
+            }
         },
-        "relationships": {
-            "accounts": "customers.accounts[] -> accounts.account_id"
-        }
-    },
-    "transactions": {
-        "description": "Financial transaction records with amounts and dates",
-        "fields": {
-            "_id": {"type": "ObjectId", "description": "Unique transaction identifier"},
-            "account_id": {"type": "int", "description": "Account ID for the transaction"},
-            "transaction_count": {"type": "int", "description": "Number of transactions"},
-            "bucket_start_date": {"type": "date", "description": "Start date for transaction bucket"},
-            "bucket_end_date": {"type": "date", "description": "End date for transaction bucket"},
-            "transactions": {"type": "array", "description": "Array of individual transactions with amounts and dates"}
+        "customers": {
+            "description": "Customer profile information and contact details",
+            "fields": {
+                "_id": {"type": "ObjectId", "description": "Unique customer identifier"},
+                "username": {"type": "string", "description": "Customer username"},
+                "name": {"type": "string", "description": "Customer full name"},
+                "address": {"type": "string", "description": "Customer address"},
+                "birthdate": {"type": "date", "description": "Customer birth date"},
+                "email": {"type": "string", "description": "Customer email address"},
+                "accounts": {"type": "array", "description": "Array of account IDs belonging to this customer"},
+                "tier_and_details": {"type": "object", "description": "Customer tier information and additional details"}
+            },
+            "relationships": {
+                "accounts": "customers.accounts[] -> accounts.account_id"
+            }
         },
-        "relationships": {
-            "accounts": "transactions.account_id -> accounts.account_id"
+        "transactions": {
+            "description": "Financial transaction records with amounts and dates",
+            "fields": {
+                "_id": {"type": "ObjectId", "description": "Unique transaction identifier"},
+                "account_id": {"type": "int", "description": "Account ID for the transaction"},
+                "transaction_count": {"type": "int", "description": "Number of transactions"},
+                "bucket_start_date": {"type": "date", "description": "Start date for transaction bucket"},
+                "bucket_end_date": {"type": "date", "description": "End date for transaction bucket"},
+                "transactions": {"type": "array", "description": "Array of individual transactions with amounts and dates"}
+            },
+            "relationships": {
+                "accounts": "transactions.account_id -> accounts.account_id"
+            }
         }
-    }
-}
+    })
 
-# Query type classifications
-QUERY_TYPES = {
+# Query type classifications (read-only, shared by every prompt)
+QUERY_TYPES = MappingProxyType({
     "definition": "Explain what a field, collection, or concept means",
     "filter": "Find documents matching specific criteria",
     "aggregation": "Calculate statistics like sum, average, count, min, max",
     "count": "Count documents or records",
     "trend": "Analyze patterns over time",
     "comparison": "Compare different groups or values"
-}
+})
 
-# Sample queries for few-shot prmpting
-SAMPLE_QUERIES = {
-    "What is the accounts collection?": {
-        "type": "definition",
-        "query": None,
-        "response": "The accounts collection contains customer account information including credit limits and financial products."
-    },
-    "Show me all customers": {
-        "type": "filter", 
-        "query": {"collection": "customers", "operation": "find", "filter": {}},
-        "response": "Here are all customers in the database"
-    },
-    "How many customers do we have?": {
-        "type": "count",
-        "query": {"collection": "customers", "operation": "count_documents", "filter": {}},
-        "response": "Total number of customers"
-    },
-    "What's the average account limit?": {
-        "type": "aggregation",
-        "query": {"collection": "accounts", "operation": "aggregate", "pipeline": [{"$group": {"_id": None, "avg_limit": {"$avg": "$limit"}}}]},
-        "response": "Average account limit across all accounts"
+def _build_sample_queries() -> Dict[str, Any]:
+    """Sample queries for few-shot prmpting"""
+    return {
+        "What is the accounts collection?": {
+            "type": "definition",
+            "query": None,
+            "response": "The accounts collection contains customer account information including credit limits and financial products."
+        },
+        "Show me all customers": {
+            "type": "filter", 
+            "query": {"collection": "customers", "operation": "find", "filter": {}},
+            "response": "Here are all customers in the database"
+        },
+        "How many customers do we have?": {
+            "type": "count",
+            "query": {"collection": "customers", "operation": "count_documents", "filter": {}},
+            "response": "Total number of customers"
+        },
+        "What's the average account limit?": {
+            "type": "aggregation",
+            "query": {"collection": "accounts", "operation": "aggregate", "pipeline": [{"$group": {"_id": None, "avg_limit": {"$avg": "$limit"}}}]},
+            "response": "Average account limit across all accounts"
+        }
     }
+
+# The global config and the big constant dicts are only built the first time
+# someone actually imports them (PEP 562)
+_LAZY_CONSTANTS = {
+    "config": Config,
+    "SAMPLE_ANALYTICS_SCHEMA": _build_schema,
+    "SAMPLE_QUERIES": _build_sample_queries,
 }
 
+def __getattr__(name: str) -> Any:
+    builder = _LAZY_CONSTANTS.get(name)
+    if builder is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = builder()
+    globals()[name] = value
+    return value
+
+def get_config() -> Config:
+    """Get the global configuration instance, building it on first use"""
+    # Module __getattr__ only covers outside access, code in here has to go through this
+    if "config" in globals():
+        return globals()["config"]
+    return __getattr__("config")
+
+_validated: Optional[bool] = None
+
 def validate_config() -> bool:
     """Validate that all required configuration is present"""
+    global _validated
+    if _validated is not None:
+        return _validated
+
+    # Config() checks every section and raises with all the problems at once
     try:
-        config = Config()
-        return True
+        get_config()
+        _validated = True
     except ValueError as e:
         print(f"❌ Configuration error: {e}")
-        return False
+        _validated = False
+    return _validated
 
 if __name__ == "__main__":
     print(" Configuration Test")
     print("=" * 50)
 
     if validate_config():
+        config = get_config()
         print("✅ Configuration is valid")
         print(f"Database: {config.database.database_name}")
         print(f"LLM Model: {config.llm.model}")
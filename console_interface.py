@@ -3,63 +3,101 @@ Console Interface for Conversational Database Agent
 Provides an interactive command-line interface for testing the agent
 """
 
+import io
 import sys
 import time
-from typing import Dict, Any
-from database_agent import ConversationalDatabaseAgent
-from config import config
+from itertools import islice
+from typing import Dict, Any, Optional
+
+try:
+    # Gives input() line editing and history for free (not available on Windows)
+    import readline
+except ImportError:
+    pass
+
+EXAMPLE_QUERIES = (
+    "What is the accounts collection?",
+    "How many customers do we have?",
+    "Show me all customers",
+    "What's the average account limit?",
+    "Find customers with email addresses",
+    "How many accounts have InvestmentStock products?",
+    "Show me recent transactions",
+    "What products are available?"
+)
+
+# Examples never change, so format them once at import
+_EXAMPLES_OUTPUT = "\n".join([
+    "\n EXAMPLE QUERIES:",
+    *(f"{i:2d}. {example}" for i, example in enumerate(EXAMPLE_QUERIES, 1)),
+    "-" * 60,
+])
 
 class ConsoleInterface:
     """Interactive console interface for the database agent"""
 
+    # Static screens are written in one go instead of one print() per line
+    HELP_TEXT = "\n".join([
+        "\n HELP - Available Commands:",
+        "🔸 Ask any question about your data",
+        "🔸 'help' - Show this help message",
+        "🔸 'insights' - Show conversation insights",
+        "🔸 'reset' - Clear conversation history",
+        "🔸 'schema' - Show database schema",
+        "🔸 'examples' - Show example queries",
+        "🔸 'quit' or 'exit' - Exit the application",
+        "-" * 60,
+    ])
+
     def __init__(self):
+        # Imported here so a bad config fails before the config object or
+        # pymongo/openai get pulled in
+        from config import config
+        from database_agent import ConversationalDatabaseAgent
         self.agent = ConversationalDatabaseAgent()
         self.running = False
+        self._schema_rendered: Optional[str] = None
+        self._debug = config.agent.debug_mode  # fixed for the whole session
+        self._banner = "\n".join([
+            "=" * 60,
+            " CONVERSATIONAL DATABASE AGENT",
+            "=" * 60,
+            "Chat with your MongoDB database using natural language!",
+            f"Database: {config.database.database_name}",
+            f"Model: {config.llm.model}",
+            "=" * 60,
+        ])
+
+        # Command word -> handler, looked up once per input line
+        self._commands = {
+            'help': self.display_help,
+            'reset': self.reset_history,
+            'schema': self.display_schema_info,
+            'examples': self.display_examples,
+            'insights': self.display_insights,
+        }
+        self._exit_commands = frozenset({'quit', 'exit', 'bye'})
 
     def display_banner(self):
         """Display welcome banner"""
-        print("=" * 60)
-        print(" CONVERSATIONAL DATABASE AGENT")
-        print("=" * 60)
-        print("Chat with your MongoDB database using natural language!")
-        print("Database:", config.database.database_name)
-        print("Model:", config.llm.model)
-        print("=" * 60)
+        print(self._banner)
 
     def display_help(self):
         """Display help information"""
-        print("\n HELP - Available Commands:")
-        print("🔸 Ask any question about your data")
-        print("🔸 'help' - Show this help message")
-        print("🔸 'insights' - Show conversation insights")
-        print("🔸 'reset' - Clear conversation history")
-        print("🔸 'schema' - Show database schema")
-        print("🔸 'examples' - Show example queries")
-        print("🔸 'quit' or 'exit' - Exit the application")
-        print("-" * 60)
+        print(self.HELP_TEXT)
 
     def display_examples(self):
         """Display example queries"""
-        examples = [
-            "What is the accounts collection?",
-            "How many customers do we have?",
-            "Show me all customers",
-            "What's the average account limit?",
-            "Find customers with email addresses",
-            "How many accounts have InvestmentStock products?",
-            "Show me recent transactions",
-            "What products are available?"
-        ]
-
-        print("\n EXAMPLE QUERIES:")
-        for i, example in enumerate(examples, 1):
-            print(f"{i:2d}. {example}")
-        print("-" * 60)
+        print(_EXAMPLES_OUTPUT)
 
     def display_schema_info(self):
         """Display database schema information"""
         print("\n DATABASE SCHEMA:")
 
+        if self._schema_rendered is not None:
+            sys.stdout.write(self._schema_rendered)
+            return
+
         if not self.agent.schema_manager:
             print("❌ Schema manager not initialized")
             return
@@ -69,19 +107,25 @@ class ConsoleInterface:
             print(" Discovering schema...")
             schema = self.agent.schema_manager.discover_schema()
 
+        # Render everything into one buffer and hit stdout with a single write
+        buf = io.StringIO()
         for collection_name, info in schema.items():
-            print(f"\n Collection: {collection_name}")
-            print(f"   Documents: {info.get('document_count', 'Unknown')}")
+            buf.write(f"\n Collection: {collection_name}\n")
+            buf.write(f"   Documents: {info.get('document_count', 'Unknown')}\n")
 
             fields = info.get('fields', {})
-            print(f"   Fields ({len(fields)}):")
-            for field_name, field_info in list(fields.items())[:5]:
-                print(f"     • {field_name}: {field_info.get('type', 'unknown')}")
+            buf.write(f"   Fields ({len(fields)}):\n")
+            for field_name, field_info in islice(fields.items(), 5):
+                buf.write(f"     • {field_name}: {field_info.get('type', 'unknown')}\n")
 
             if len(fields) > 5:
-                print(f"     ... and {len(fields) - 5} more fields")
+                buf.write(f"     ... and {len(fields) - 5} more fields\n")
 
-        print("-" * 60)
+        buf.write("-" * 60 + "\n")
+
+        # Keep the rendered text so repeated 'schema' commands skip discovery and formatting
+        self._schema_rendered = buf.getvalue()
+        sys.stdout.write(self._schema_rendered)
 
     def display_insights(self):
         """Display conversation insights"""
@@ -108,34 +152,29 @@ class ConsoleInterface:
 
         print("-" * 60)
 
+    def reset_history(self):
+        """Clear conversation history"""
+        self.agent.reset_conversation()
+        self._schema_rendered = None
+        print("✅ Conversation history cleared")
+
     def process_command(self, user_input: str) -> bool:
         """Process user command and return whether to continue"""
 
-        user_input = user_input.strip().lower()
-
-        if user_input in ['quit', 'exit', 'bye']:
-            return False
-
-        elif user_input == 'help':
-            self.display_help()
+        # if empty input, just continue without any string work
+        if not user_input:
+            return True
 
-        elif user_input == 'reset':
-            self.agent.reset_conversation()
-            print("✅ Conversation history cleared")
+        # run() already stripped the line; lowercase only for command matching so
+        # the query itself reaches the LLM with its original casing
+        cmd = user_input.lower()
 
-        elif user_input == 'schema':
-            self.display_schema_info()
-
-        elif user_input == 'examples':
-            self.display_examples()
-
-        elif user_input == 'insights':
-            self.display_insights()
-
-        elif user_input == '':
-            # if empty input, just continue
-            pass
+        if cmd in self._exit_commands:
+            return False
 
+        handler = self._commands.get(cmd)
+        if handler:
+            handler()
         else:
             # Process as a query, duh
             self.process_query(user_input)
@@ -155,7 +194,7 @@ class ConsoleInterface:
 
             print(f"\n Assistant: {response}")
 
-            if config.agent.debug_mode and result:
+            if self._debug and result:
                 print(f"\n Debug Info:")
                 print(f"   Query Type: {result.query_type}")
                 print(f"   Success: {result.success}")
@@ -186,8 +225,8 @@ class ConsoleInterface:
 
         try:
             while self.running:
-                print()  ##spacing
-                user_input = input("👤 You: ").strip()
+                # leading newline in the prompt does the spacing, no extra print()
+                user_input = input("\n👤 You: ").strip()
 
                 if not self.process_command(user_input):
                     break
@@ -202,6 +241,27 @@ class ConsoleInterface:
             print("\nDisconnecting...")
             self.agent.disconnect()
 
+# Short on purpose: this only answers "is MongoDB reachable at all?"
+PROBE_TIMEOUT_MS = 1500
+
+def probe_database() -> bool:
+    """Quick connectivity check before building the agent and printing the banner"""
+    from pymongo import MongoClient
+    from config import config
+
+    client = None
+    try:
+        # Inside the try: a bad URI or failed mongodb+srv DNS lookup raises right here
+        client = MongoClient(config.database.connection_string, serverSelectionTimeoutMS=PROBE_TIMEOUT_MS)
+        client.admin.command('ping')
+        return True
+    except Exception as e:
+        print(f"❌ Cannot reach MongoDB: {e}")
+        return False
+    finally:
+        if client is not None:
+            client.close()
+
 def main():
     """Main entry point"""
 
@@ -212,6 +272,10 @@ def main():
         print("❌ Configuration validation failed. Please check your .env file.(Need to have all the credentials and the hyperparameters correctly filled in the .env file)")
         sys.exit(1)
 
+    if not probe_database():
+        print("❌ Check MONGODB_CONNECTION_STRING and your network/IP whitelist.")
+        sys.exit(1)
+
     interface = ConsoleInterface()
     interface.run()
 
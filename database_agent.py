@@ -3,12 +3,19 @@ Conversational Database Agent for MongoDB
 Implements natural language to MongoDB query translation with conversation memory
 """
 
+import hashlib
 import json
 import logging
+import os
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Callable, Deque, Dict, Iterator, List, Any, Mapping, Optional, Tuple
 from dataclasses import dataclass
 import re
+from pathlib import Path
+from string import Template
 
 import pymongo
 from pymongo import MongoClient
@@ -18,7 +25,33 @@ from langchain.memory import ConversationBufferMemory
 from langchain.schema import BaseMessage, HumanMessage, AIMessage
 
 from config import config, SAMPLE_ANALYTICS_SCHEMA, QUERY_TYPES, SAMPLE_QUERIES
-
+from router import QueryRouter
+
+
+try:
+    # orjson is a lot faster for the big schema dumps; stdlib json works fine without it
+    import orjson
+except ImportError:
+    orjson = None
+
+def _json_default(obj: Any) -> Any:
+    """Fallback for values json can't handle natively (SON, ObjectId, datetime, ...)"""
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    return str(obj)
+
+def json_dumps(obj: Any, indent: bool = False, sort_keys: bool = False) -> str:
+    """Serialize to a JSON string with orjson when available"""
+    if orjson is not None:
+        option = (orjson.OPT_INDENT_2 if indent else 0) | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(obj, default=_json_default, option=option).decode()
+    return json.dumps(obj, indent=2 if indent else None, sort_keys=sort_keys, default=_json_default)
+
+def json_loads(data: Any) -> Any:
+    """Parse JSON from str or bytes with orjson when available"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
 
 logging.basicConfig(level=logging.INFO if config.agent.debug_mode else logging.WARNING)
 logger = logging.getLogger(__name__)
@@ -41,6 +74,68 @@ class ConversationInsight:
     data_gaps: List[str]
     suggested_queries: List[str]
 
+SCHEMA_CACHE_DIR = Path.home() / ".cache" / "dbagent"
+
+# Sent with every completion when LATENCY_MODE is on. Only for OpenAI-compatible
+# gateways in front of Bedrock that understand it (OPENAI_BASE_URL), api.openai.com
+# rejects unknown fields so config refuses the mode without a base URL
+LATENCY_OPTIMIZED_KWARGS = {"extra_body": {"performanceConfig": {"latency": "optimized"}}}
+
+# Fields returned by find() when the query didn't mention any specific ones
+PROJECTION_DEFAULT_FIELDS = 8
+
+# Leading schema fields always kept so rows stay identifiable (account_id, username, ...)
+PROJECTION_ID_FIELDS = 2
+
+# aggregation_type from the classifier -> MongoDB accumulator
+AGGREGATION_OPERATORS = {"avg": "$avg", "sum": "$sum", "max": "$max", "min": "$min"}
+
+# Candidate date fields in order of preference
+DATE_FIELD_CANDIDATES = ("date", "created_at", "timestamp", "birthdate",
+                         "bucket_start_date", "bucket_end_date")
+
+def _build_date_field_map() -> Dict[str, str]:
+    """Best date field per known collection, worked out once instead of on every trend query"""
+    date_fields = {}
+    for name, info in SAMPLE_ANALYTICS_SCHEMA.items():
+        for field in DATE_FIELD_CANDIDATES:
+            if field in info["fields"]:
+                date_fields[name] = field
+                break
+    return date_fields
+
+_DATE_FIELD_BY_COLLECTION = _build_date_field_map()
+
+# Documents kept from a find() for the response; the rest are only counted
+FIND_PREVIEW_LIMIT = 3
+
+# Sample 5 documents and reduce each to [{k: name, t: bson type, v: scalar value or null}]
+SCHEMA_SAMPLE_PIPELINE = [
+    {"$sample": {"size": 5}},
+    {"$project": {
+        "_id": 0,
+        "fields": {"$map": {
+            "input": {"$objectToArray": "$$ROOT"},
+            "as": "f",
+            "in": {
+                "k": "$$f.k",
+                "t": {"$type": "$$f.v"},
+                "v": {"$cond": [{"$in": [{"$type": "$$f.v"}, ["object", "array"]]}, None, "$$f.v"]}
+            }
+        }}
+    }}
+]
+
+def schema_shape(schema: Mapping[str, Any]) -> Dict[str, Any]:
+    """Schema without the per-field sample values (real customer data: names, emails, addresses)"""
+    return {
+        name: {**info, "fields": {
+            field: {k: v for k, v in field_info.items() if k != "sample_value"}
+            for field, field_info in info.get("fields", {}).items()
+        }}
+        for name, info in schema.items()
+    }
+
 class DatabaseSchemaManager:
     """Manages MongoDB schema metadata and field mappings"""
 
@@ -49,6 +144,71 @@ class DatabaseSchemaManager:
         self.database_name = database_name
         self.db = client[database_name]
         self.schema_cache = {}
+        # Bumped on every discovery so callers can key caches on the schema they saw
+        self.schema_version = 0
+        # Called after every rediscovery so dependents can drop stale metadata
+        self.refresh_callbacks: List[Callable[[], None]] = []
+
+        # Discovered schema is saved to disk so restarts don't have to rediscover it
+        self.cache_path = SCHEMA_CACHE_DIR / f"schema_{database_name}.json"
+        if not config.agent.refresh_schema:
+            self.schema_cache = self._load_persisted_schema()
+
+    def _load_persisted_schema(self) -> Dict[str, Any]:
+        """Load the saved schema if it exists and is younger than the configured TTL"""
+        ttl = config.agent.schema_cache_ttl_s
+        try:
+            if ttl <= 0 or time.time() - self.cache_path.stat().st_mtime > ttl:
+                return {}
+            with open(self.cache_path, "rb") as f:
+                schema = json_loads(f.read())
+            logger.info(f"Loaded schema from {self.cache_path}")
+            return schema
+        except (OSError, ValueError):
+            return {}
+
+    def _persist_schema(self, schema: Dict[str, Any]):
+        """Save the discovered schema without sample values (ObjectId/SON/datetime get flattened by json)"""
+        if config.agent.schema_cache_ttl_s <= 0 or not schema:
+            return
+        shape = schema_shape(schema)
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            # Owner-only file, also tightening one left behind by an older version
+            fd = os.open(self.cache_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            os.chmod(self.cache_path, 0o600)
+            with open(fd, "w", encoding="utf-8") as f:
+                f.write(json_dumps(shape))
+        except OSError as e:
+            logger.warning(f"Could not save schema cache: {e}")
+
+    def _probe(self, collection_name: str) -> Optional[Dict[str, Any]]:
+        """Sample one collection's fields, document count and indexes (None if it's empty)"""
+        collection = self.db[collection_name]
+
+        # Server-side sample that only ships field names, BSON types and
+        # scalar values back; nested objects/arrays are never sent over the wire
+        sample_docs = list(collection.aggregate(SCHEMA_SAMPLE_PIPELINE))
+        if not sample_docs:
+            return None
+
+        #field infoo
+        fields = {}
+        for doc in sample_docs:
+            for entry in doc["fields"]:
+                if entry["k"] not in fields:
+                    value = entry.get("v")
+                    fields[entry["k"]] = {
+                        "type": entry["t"],
+                        "sample_value": str(value)[:100] if value is not None else f"<{entry['t']}>"
+                    }
+
+        return {
+            # Reads collection metadata instead of counting every document
+            "document_count": collection.estimated_document_count(),
+            "fields": fields,
+            "indexes": list(collection.list_indexes())
+        }
 
     def discover_schema(self) -> Dict[str, Any]:
         """Discover database schema by examining collections and documents"""
@@ -58,36 +218,45 @@ class DatabaseSchemaManager:
             collections = self.db.list_collection_names()
             logger.info(f"Found collections: {collections}")
 
-            for collection_name in collections:
-                collection = self.db[collection_name]
-
-                #//
-                sample_docs = list(collection.find().limit(5))
-                if not sample_docs:
-                    continue
-
-                #field infoo
-                fields = {}
-                for doc in sample_docs:
-                    for field, value in doc.items():
-                        if field not in fields:
-                            fields[field] = {
-                                "type": type(value).__name__,
-                                "sample_value": str(value)[:100]
-                            }
-
-                schema[collection_name] = {
-                    "document_count": collection.count_documents({}),
-                    "fields": fields,
-                    "indexes": list(collection.list_indexes())
-                }
+            # Each probe is a few round trips of waiting, so run the collections side by side
+            if collections:
+                with ThreadPoolExecutor(max_workers=min(8, len(collections))) as pool:
+                    for collection_name, info in zip(collections, pool.map(self._probe, collections)):
+                        if info is not None:
+                            schema[collection_name] = info
 
         except Exception as e:
             logger.error(f"Error discovering schema: {e}")
 
         self.schema_cache = schema
+        self.schema_version += 1
+        self._persist_schema(schema)
+        for callback in self.refresh_callbacks:
+            callback()
         return schema
+
+    def refresh_schema(self) -> Dict[str, Any]:
+        """Throw away the saved schema and rediscover it from the database"""
+        # Remove the file first, a failed discovery must not leave the stale copy behind
+        try:
+            self.cache_path.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Could not remove schema cache: {e}")
+        return self.discover_schema()
+
     #  using SAMPLE ANALYTICS data because of the limited time as well as I had a lot of things to learn already, so this would have taken much longer. If you want me to do it with other data, reach out to me again.
+    def get_list_fields(self, collection_name: str) -> frozenset:
+        """Names of the fields in a collection that hold arrays"""
+        info = self.schema_cache.get(collection_name) or SAMPLE_ANALYTICS_SCHEMA.get(collection_name, {})
+        return frozenset(
+            name for name, field in info.get("fields", {}).items()
+            if field.get("type") in ("array", "list")
+        )
+
+    def get_exact_count(self, collection_name: str) -> int:
+        """Exact document count for when the metadata estimate isn't good enough"""
+        return self.db[collection_name].count_documents({})
+
     def get_collection_info(self, collection_name: str) -> Dict[str, Any]:
         """Get detailed information about a specific collection"""
         if collection_name in SAMPLE_ANALYTICS_SCHEMA:
@@ -101,22 +270,67 @@ class DatabaseSchemaManager:
 class NaturalLanguageProcessor:
     """Processes natural language queries using OpenAI GPT (smart)"""
 
-    def __init__(self):
-        self.client = openai.OpenAI(api_key=config.llm.api_key)
-
-    def classify_query(self, query: str, schema_info: Dict) -> Dict[str, Any]:
-        """Classify user query and extract intent"""
+    # How many classifications to remember before dropping the oldest
+    CACHE_SIZE = 256
+    # Larger schemas only get the best-matching collections inlined into the prompt
+    MAX_PROMPT_COLLECTIONS = 5
+
+    def __init__(self, llm_kwargs: Optional[Dict[str, Any]] = None):
+        self.client = openai.OpenAI(api_key=config.llm.api_key, base_url=config.llm.base_url)
+        # Extra arguments for every chat completion (e.g. LATENCY_OPTIMIZED_KWARGS)
+        self.llm_kwargs = dict(llm_kwargs or {})
+        self._classification_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # (id(schema_info), selected collections) -> (schema digest, system prompt);
+        # the schema only changes on rediscovery
+        self._system_prompt_cache: Dict[Tuple[int, Optional[Tuple[str, ...]]], Tuple[str, str]] = {}
+
+    def clear_prompt_cache(self):
+        """Drop cached system prompts (called when the schema is rediscovered)"""
+        self._system_prompt_cache.clear()
+
+    def _select_collections(self, query: str, schema_info: Dict) -> Optional[Tuple[str, ...]]:
+        """Keyword-match the query against collection and field names; None means use everything"""
+        if len(schema_info) <= self.MAX_PROMPT_COLLECTIONS:
+            return None
+
+        words = set(re.findall(r"\w+", query.lower()))
+        scores = {}
+        for name, info in schema_info.items():
+            singular = name[:-1] if name.endswith("s") else name
+            score = 3 if (name.lower() in words or singular.lower() in words) else 0
+            score += sum(1 for field in info.get("fields", {}) if field.lower() in words)
+            if score:
+                scores[name] = score
+
+        if not scores:
+            return None  # nothing obviously relevant, let the LLM see the whole schema
+
+        best = sorted(scores, key=scores.get, reverse=True)[:self.MAX_PROMPT_COLLECTIONS]
+        return tuple(sorted(best))
+
+    def _get_system_prompt(self, schema_info: Dict, collections: Optional[Tuple[str, ...]] = None) -> Tuple[str, str]:
+        """Build the classification system prompt once per schema (and collection subset) and reuse it"""
+        key = (id(schema_info), collections)
+        cached = self._system_prompt_cache.get(key)
+        if cached is not None:
+            return cached
+
+        if collections is not None:
+            schema_info = {name: schema_info[name] for name in collections}
+        # Same prompt whether the schema was just discovered or loaded from disk,
+        # and no customer data sent to the LLM
+        schema_info = schema_shape(schema_info)
 
         system_prompt = f"""You are an expert at analyzing natural language queries for MongoDB databases.
 
 Database Schema:
-{json.dumps(schema_info, indent=2)}
+{json_dumps(schema_info, indent=True)}
 
 Query Types:
-{json.dumps(QUERY_TYPES, indent=2)}
+{json_dumps(dict(QUERY_TYPES), indent=True)}
 
 Sample Queries:
-{json.dumps(SAMPLE_QUERIES, indent=2)}
+{json_dumps(SAMPLE_QUERIES, indent=True)}
 
 Classify the user query and return a JSON response with:
 1. query_type: one of {list(QUERY_TYPES.keys())}
@@ -126,9 +340,90 @@ Classify the user query and return a JSON response with:
 5. extracted_fields: relevant fields mentioned
 6. filters: any filtering criteria mentioned
 7. aggregation_type: if aggregation, specify type (sum, avg, count, etc.)
+   aggregation_types: if the user asks for several metrics at once, list them all (e.g. ["avg", "sum", "count"])
+8. response_template: a one-sentence answer for the user, written before the query runs,
+   using $count for the number of matching records and $result for a computed value
+   (e.g. "We have $count customers." or "The average account limit is $result.")
 
 Be precise and consider context from the schema."""
 
+        schema_digest = hashlib.sha256(
+            json_dumps(schema_info, sort_keys=True).encode()
+        ).hexdigest()
+
+        self._system_prompt_cache[key] = (schema_digest, system_prompt)
+        return schema_digest, system_prompt
+
+    @staticmethod
+    def _cache_key(query: str, schema_digest: str) -> str:
+        """Cache key from the normalized query text and the schema it was classified against"""
+        # Only cosmetic punctuation goes; operators and signs change what the query means
+        # ("limit > 10000" vs "limit < 10000", "-500" vs "500")
+        normalized = " ".join(re.sub(r"[^\w\s<>=!\-.$]", " ", query.lower()).split())
+        return hashlib.sha256(f"{normalized}\x00{schema_digest}".encode()).hexdigest()
+
+    def classify_queries(self, queries: List[str], schema_info: Dict) -> List[Dict[str, Any]]:
+        """Classify several queries with a single chat completion (cache hits are skipped)"""
+        schema_digest, system_prompt = self._get_system_prompt(schema_info)
+
+        results: List[Optional[Dict[str, Any]]] = []
+        misses = []
+        for i, query in enumerate(queries):
+            cached = self._classification_cache.get(self._cache_key(query, schema_digest))
+            results.append(dict(cached) if cached is not None else None)
+            if cached is None:
+                misses.append(i)
+
+        if misses:
+            batch = [queries[i] for i in misses]
+            try:
+                response = self.client.chat.completions.create(
+                    model=config.llm.model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": (
+                            "Classify each of these queries independently. Return a JSON object "
+                            "with key \"classifications\": an array with one classification per "
+                            f"query, in the same order.\nQueries: {json_dumps(batch)}"
+                        )}
+                    ],
+                    temperature=config.llm.temperature,
+                    max_tokens=min(500 * len(batch), 4000),
+                    response_format={"type": "json_object"},
+                    **self.llm_kwargs
+                )
+                classifications = json_loads(response.choices[0].message.content)["classifications"]
+                if len(classifications) != len(batch):
+                    raise ValueError(f"expected {len(batch)} classifications, got {len(classifications)}")
+
+                for i, classification in zip(misses, classifications):
+                    self._classification_cache[self._cache_key(queries[i], schema_digest)] = classification
+                    results[i] = dict(classification)
+                while len(self._classification_cache) > self.CACHE_SIZE:
+                    self._classification_cache.popitem(last=False)
+
+            except Exception as e:
+                # One bad batch shouldn't sink every query, fall back to one call each
+                logger.error(f"Error classifying query batch, falling back to single calls: {e}")
+                for i in misses:
+                    results[i] = self.classify_query(queries[i], schema_info)
+
+        return results
+
+    def classify_query(self, query: str, schema_info: Dict) -> Dict[str, Any]:
+        """Classify user query and extract intent"""
+
+        schema_digest, system_prompt = self._get_system_prompt(
+            schema_info, self._select_collections(query, schema_info)
+        )
+
+        # Same question against the same schema -> skip the OpenAI round trip
+        cache_key = self._cache_key(query, schema_digest)
+        cached = self._classification_cache.get(cache_key)
+        if cached is not None:
+            self._classification_cache.move_to_end(cache_key)
+            return dict(cached)
+
         try:
             response = self.client.chat.completions.create(
                 model=config.llm.model,
@@ -137,11 +432,19 @@ Be precise and consider context from the schema."""
                     {"role": "user", "content": f"Query: {query}"}
                 ],
                 temperature=config.llm.temperature,
-                max_tokens=500
+                max_tokens=500,
+                # JSON mode: no markdown fences or chatter around the object we parse
+                response_format={"type": "json_object"},
+                **self.llm_kwargs
             )
 
-            result = json.loads(response.choices[0].message.content)
-            return result
+            result = json_loads(response.choices[0].message.content)
+
+            self._classification_cache[cache_key] = result
+            if len(self._classification_cache) > self.CACHE_SIZE:
+                self._classification_cache.popitem(last=False)
+
+            return dict(result)
 
         except Exception as e:
             logger.error(f"Error classifying query: {e}")
@@ -162,7 +465,19 @@ class MongoDBQueryExecutor:
         self.client = client
         self.database_name = database_name
         self.db = client[database_name]
-        self.nlp = NaturalLanguageProcessor()
+        self._collections: Optional[set] = None
+
+    def _collection_exists(self, name: Optional[str]) -> bool:
+        """Check a collection name against a cached set instead of asking Mongo every query"""
+        if not name:
+            return False
+        if self._collections is None:
+            self._collections = set(self.db.list_collection_names())
+        return name in self._collections
+
+    def invalidate_collections(self):
+        """Forget the cached collection names (called when the schema is rediscovered)"""
+        self._collections = None
 
     def translate_to_mongodb_query(self, classification: Dict[str, Any]) -> Dict[str, Any]:
         """Translate classified intent to MongoDB query"""
@@ -178,7 +493,9 @@ class MongoDBQueryExecutor:
                 "type": "find",
                 "collection": collection,
                 "filter": classification.get("filters", {}),
-                "limit": config.agent.max_query_results
+                "projection": self._build_projection(collection, classification.get("extracted_fields")),
+                "limit": config.agent.max_query_results,
+                "preview_limit": FIND_PREVIEW_LIMIT
             }
 
         elif query_type == "count":
@@ -196,6 +513,23 @@ class MongoDBQueryExecutor:
             if classification.get("filters"):
                 pipeline.append({"$match": classification["filters"]})
 
+            # Several metrics at once -> one $group with an accumulator per metric,
+            # so the server computes all of them in a single pass
+            metrics = [m for m in classification.get("aggregation_types") or []
+                       if m == "count" or (m in AGGREGATION_OPERATORS and field)]
+            if len(metrics) > 1:
+                group = {"_id": None}
+                for metric in metrics:
+                    group[metric] = {"$sum": 1} if metric == "count" else {AGGREGATION_OPERATORS[metric]: f"${field}"}
+                pipeline.append({"$group": group})
+                pipeline.append({"$project": {"_id": 0}})
+
+                return {
+                    "type": "aggregate",
+                    "collection": collection,
+                    "pipeline": pipeline
+                }
+
             if agg_type == "avg" and field:
                 pipeline.append({"$group": {"_id": None, "result": {"$avg": f"${field}"}}})
             elif agg_type == "sum" and field:
@@ -232,31 +566,39 @@ class MongoDBQueryExecutor:
 
         return {"type": "unknown"}
 
-    def _find_date_field(self, collection_name: str) -> str:
-        """Find the most likely date field in a collection"""
-        date_fields = ["date", "created_at", "timestamp", "birthdate", 
-                      "bucket_start_date", "bucket_end_date"]
+    def _build_projection(self, collection_name: str, extracted_fields: Optional[List[str]]) -> Optional[Dict[str, int]]:
+        """Only pull the fields we'll actually show instead of whole documents"""
+        if collection_name not in SAMPLE_ANALYTICS_SCHEMA:
+            return None  # unknown shape, a guessed projection could hide everything
 
-        if collection_name in SAMPLE_ANALYTICS_SCHEMA:
-            fields = SAMPLE_ANALYTICS_SCHEMA[collection_name]["fields"]
-            for field in date_fields:
-                if field in fields:
-                    return field
+        known = [f for f in SAMPLE_ANALYTICS_SCHEMA[collection_name]["fields"] if f != "_id"]
+        extracted = [f for f in (extracted_fields or []) if f in known]
+        if extracted:
+            # "limit over 5000" alone would give bare limit values with nothing to tell the rows apart
+            wanted = known[:PROJECTION_ID_FIELDS] + [f for f in extracted if f not in known[:PROJECTION_ID_FIELDS]]
+        else:
+            wanted = known[:PROJECTION_DEFAULT_FIELDS]
+
+        projection = {"_id": 0}
+        projection.update({field: 1 for field in wanted})
+        return projection
 
-        return "created_at"  # Default fallback
+    def _find_date_field(self, collection_name: str) -> str:
+        """Find the most likely date field in a collection"""
+        return _DATE_FIELD_BY_COLLECTION.get(collection_name, "created_at")  # Default fallback
 
     def execute_query(self, query_dict: Dict[str, Any]) -> QueryResult:
         """Execute MongoDB query and return results"""
-        start_time = datetime.now()
+        start_ns = time.perf_counter_ns()
 
         try:
             query_type = query_dict.get("type")
             collection_name = query_dict.get("collection")
 
             if query_type == "definition":
-                return self._handle_definition(collection_name, start_time)
+                return self._handle_definition(collection_name, start_ns)
 
-            if not collection_name or collection_name not in self.db.list_collection_names():
+            if not self._collection_exists(collection_name):
                 return QueryResult(
                     success=False,
                     data=None,
@@ -272,27 +614,37 @@ class MongoDBQueryExecutor:
                 filter_dict = query_dict.get("filter", {})
                 limit = query_dict.get("limit", config.agent.max_query_results)
 
-                cursor = collection.find(filter_dict).limit(limit)
-                results = list(cursor)
+                preview_limit = query_dict.get("preview_limit", FIND_PREVIEW_LIMIT)
+
+                # The server counts matches up to the limit; only the documents the
+                # response will actually show get sent over and decoded
+                count = collection.count_documents(filter_dict, limit=limit)
+                results = []
+                if count:
+                    results = list(
+                        collection.find(filter_dict, query_dict.get("projection"))
+                        .limit(min(preview_limit, limit))
+                    )
 
                 return QueryResult(
                     success=True,
                     data=results,
-                    count=len(results),
+                    count=count,
                     query_type=query_type,
-                    execution_time_ms=(datetime.now() - start_time).total_seconds() * 1000
+                    execution_time_ms=(time.perf_counter_ns() - start_ns) / 1_000_000
                 )
 
             elif query_type == "count":
                 filter_dict = query_dict.get("filter", {})
-                count = collection.count_documents(filter_dict)
+                # An unfiltered count can come from collection metadata instead of a scan
+                count = collection.count_documents(filter_dict) if filter_dict else collection.estimated_document_count()
 
                 return QueryResult(
                     success=True,
                     data={"count": count},
                     count=count,
                     query_type=query_type,
-                    execution_time_ms=(datetime.now() - start_time).total_seconds() * 1000
+                    execution_time_ms=(time.perf_counter_ns() - start_ns) / 1_000_000
                 )
 
             elif query_type == "aggregate":
@@ -304,7 +656,7 @@ class MongoDBQueryExecutor:
                     data=results,
                     count=len(results),
                     query_type=query_type,
-                    execution_time_ms=(datetime.now() - start_time).total_seconds() * 1000
+                    execution_time_ms=(time.perf_counter_ns() - start_ns) / 1_000_000
                 )
 
         except Exception as e:
@@ -314,11 +666,11 @@ class MongoDBQueryExecutor:
                 data=None,
                 count=0,
                 query_type=query_dict.get("type", "unknown"),
-                execution_time_ms=(datetime.now() - start_time).total_seconds() * 1000,
+                execution_time_ms=(time.perf_counter_ns() - start_ns) / 1_000_000,
                 error_message=str(e)
             )
 
-    def _handle_definition(self, collection_name: str, start_time: datetime) -> QueryResult:
+    def _handle_definition(self, collection_name: str, start_ns: int) -> QueryResult:
         """Handle definition queries"""
         if collection_name in SAMPLE_ANALYTICS_SCHEMA:
             info = SAMPLE_ANALYTICS_SCHEMA[collection_name]
@@ -332,7 +684,7 @@ class MongoDBQueryExecutor:
                 },
                 count=1,
                 query_type="definition",
-                execution_time_ms=(datetime.now() - start_time).total_seconds() * 1000
+                execution_time_ms=(time.perf_counter_ns() - start_ns) / 1_000_000
             )
 
         return QueryResult(
@@ -340,13 +692,16 @@ class MongoDBQueryExecutor:
             data=None,
             count=0,
             query_type="definition",
-            execution_time_ms=(datetime.now() - start_time).total_seconds() * 1000,
+            execution_time_ms=(time.perf_counter_ns() - start_ns) / 1_000_000,
             error_message=f"No definition available for collection '{collection_name}'"
         )
 
 class ConversationMemoryManager:
     """Manages conversation history and context using LangChain"""
 
+    # Messages kept in the buffer (5 exchanges); older ones are dropped, not summarised
+    MAX_CONTEXT_MESSAGES = 10
+
     def __init__(self):
         self.memory = ConversationBufferMemory(
             memory_key="chat_history",
@@ -354,7 +709,10 @@ class ConversationMemoryManager:
             output_key="ai_output",
             return_messages=True
         )
-        self.conversation_log = []
+        # Ring buffer: the oldest exchange drops off by itself once the history is full
+        self.conversation_log: Deque[Dict[str, Any]] = deque(maxlen=config.agent.max_conversation_history)
+        # Formatted context string, rebuilt only after the history changes
+        self._context_cache: Optional[str] = None
 
     def add_exchange(self, human_input: str, ai_output: str, query_result: Optional[QueryResult] = None):
         """Add a conversation exchange to memory"""
@@ -362,43 +720,59 @@ class ConversationMemoryManager:
             {"human_input": human_input},
             {"ai_output": ai_output}
         )
+        # Plain trim keeps the buffer bounded without an LLM call on the answer path
+        del self.memory.chat_memory.messages[:-self.MAX_CONTEXT_MESSAGES]
+        self._context_cache = None
 
         exchange = {
             "timestamp": datetime.now().isoformat(),
             "human_input": human_input,
             "ai_output": ai_output,
-            "query_result": query_result.__dict__ if query_result else None
+            # Summary only: keeping result data here would pin every fetched document
+            # in memory for the whole session
+            "query_result": {
+                "success": query_result.success,
+                "count": query_result.count,
+                "query_type": query_result.query_type,
+                "execution_time_ms": query_result.execution_time_ms,
+                "error_message": query_result.error_message
+            } if query_result else None
         }
 
         self.conversation_log.append(exchange)
 
-        # Limit conversation history
-        if len(self.conversation_log) > config.agent.max_conversation_history:
-            self.conversation_log = self.conversation_log[-config.agent.max_conversation_history:]
-
     def get_conversation_context(self) -> str:
         """Get formatted conversation history for context"""
+        if self._context_cache is not None:
+            return self._context_cache
+
         messages = self.memory.chat_memory.messages
 
         context = []
-        for message in messages[-10:]:  # Last 10 messages
+        # add_exchange already trims the buffer, no need to window here
+        for message in messages:
             if isinstance(message, HumanMessage):
                 context.append(f"Human: {message.content}")
             elif isinstance(message, AIMessage):
                 context.append(f"Assistant: {message.content}")
 
-        return "\n".join(context)
+        self._context_cache = "\n".join(context)
+        return self._context_cache
 
     def clear_memory(self):
         """Clear conversation memory"""
         self.memory.clear()
-        self.conversation_log = []
+        self.conversation_log.clear()
+        self._context_cache = None
 
 class InsightExtractor:
     """Extracts actionable insights from conversations and data gaps"""
 
-    def __init__(self):
-        self.client = openai.OpenAI(api_key=config.llm.api_key)
+    def __init__(self, llm_kwargs: Optional[Dict[str, Any]] = None):
+        self.client = openai.OpenAI(api_key=config.llm.api_key, base_url=config.llm.base_url)
+        self.llm_kwargs = dict(llm_kwargs or {})
+        # (hash of the analysed conversation, insight) so refreshing without new turns is free
+        self._last_insight: Optional[Tuple[str, ConversationInsight]] = None
 
     def extract_insights(self, conversation_log: List[Dict], query_results: List[QueryResult]) -> ConversationInsight:
         """Extract insights from conversation and query results"""
@@ -409,6 +783,10 @@ class InsightExtractor:
             for exchange in conversation_log[-5:]  # Last 5 exchanges
         ])
 
+        conversation_hash = hashlib.sha256(conversation_text.encode()).hexdigest()
+        if self._last_insight and self._last_insight[0] == conversation_hash:
+            return self._last_insight[1]
+
         prompt = f"""Analyze this conversation and extract insights:
 
 Conversation:
@@ -424,20 +802,24 @@ Return as JSON with keys: user_intent, emotional_tone, data_gaps (array), sugges
 
         try:
             response = self.client.chat.completions.create(
-                model=config.llm.model,
+                model=config.llm.insight_model,
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.3,
-                max_tokens=500
+                max_tokens=500,
+                response_format={"type": "json_object"},
+                **self.llm_kwargs
             )
 
-            result = json.loads(response.choices[0].message.content)
+            result = json_loads(response.choices[0].message.content)
 
-            return ConversationInsight(
+            insight = ConversationInsight(
                 user_intent=result.get("user_intent", "Unknown"),
                 emotional_tone=result.get("emotional_tone", "Neutral"),
                 data_gaps=result.get("data_gaps", []),
                 suggested_queries=result.get("suggested_queries", [])
             )
+            self._last_insight = (conversation_hash, insight)
+            return insight
 
         except Exception as e:
             logger.error(f"Error extracting insights: {e}")
@@ -451,28 +833,52 @@ Return as JSON with keys: user_intent, emotional_tone, data_gaps (array), sugges
 class ConversationalDatabaseAgent:
     """Main orchestrator for the conversational database agent"""
 
-    def __init__(self):
-        self.client = None
+    def __init__(self, client: Optional[MongoClient] = None, llm_kwargs: Optional[Dict[str, Any]] = None):
+        # A client passed in is shared (e.g. one pool for every Streamlit session)
+        # and stays open when this agent disconnects
+        self.client = client
+        self._owns_client = client is None
         self.schema_manager = None
         self.query_executor = None
         self.memory_manager = ConversationMemoryManager()
-        self.insight_extractor = InsightExtractor()
-        self.nlp = NaturalLanguageProcessor()
+        if llm_kwargs is None and config.agent.latency_mode:
+            llm_kwargs = LATENCY_OPTIMIZED_KWARGS
+        self.insight_extractor = InsightExtractor(llm_kwargs)
+        self.nlp = NaturalLanguageProcessor(llm_kwargs)
+        # collection name -> document formatter, rebuilt when the schema changes
+        self._formatters: Dict[Optional[str], Callable[[Dict], str]] = {}
+        # Regex shortcuts for common question shapes, rebuilt when the schema changes
+        self._router: Optional[QueryRouter] = None
+        # Result of the last process_query_stream() call
+        self.last_result: Optional[QueryResult] = None
 
     def connect_database(self) -> bool:
         """Connect to MongoDB database"""
         try:
-            self.client = MongoClient(
-                config.database.connection_string,
-                serverSelectionTimeoutMS=config.database.timeout_ms,
-                maxPoolSize=config.database.max_pool_size
-            )
+            if self.client is None:
+                self.client = MongoClient(
+                    config.database.connection_string,
+                    serverSelectionTimeoutMS=config.database.timeout_ms,
+                    maxPoolSize=config.database.max_pool_size,
+                    # Keep a couple of sockets open so idle sessions don't re-handshake
+                    minPoolSize=config.database.min_pool_size,
+                    heartbeatFrequencyMS=config.database.heartbeat_frequency_ms,
+                    appname="ConversationalDatabaseAgent"
+                )
 
             # Test connection
             self.client.admin.command('ping')
 
             self.schema_manager = DatabaseSchemaManager(self.client, config.database.database_name)
             self.query_executor = MongoDBQueryExecutor(self.client, config.database.database_name)
+            self.schema_manager.refresh_callbacks.append(self.query_executor.invalidate_collections)
+            self.schema_manager.refresh_callbacks.append(self.nlp.clear_prompt_cache)
+            self.schema_manager.refresh_callbacks.append(self._formatters.clear)
+            self.schema_manager.refresh_callbacks.append(self._reset_router)
+
+            # A shared client is already warm, only a fresh pool needs the round trips
+            if self._owns_client:
+                self._warmup_connection()
 
             logger.info(f"✅ Connected to MongoDB: {config.database.database_name}")
             return True
@@ -481,16 +887,91 @@ class ConversationalDatabaseAgent:
             logger.error(f"❌ Failed to connect to MongoDB: {e}")
             return False
 
+    def _warmup_connection(self):
+        """Touch every collection once so the first real query doesn't pay the cold-start cost"""
+        try:
+            db = self.client[config.database.database_name]
+            for name in db.list_collection_names():
+                db[name].find_one({}, {"_id": 1})
+        except Exception as e:
+            # Warmup is best effort, a failure here shouldn't block connecting
+            logger.warning(f"Connection warmup failed: {e}")
+
     def process_query(self, user_input: str) -> Tuple[str, QueryResult]:
         """Process a natural language query and return response"""
 
         # Get conversation context
         context = self.memory_manager.get_conversation_context()
 
+        classification = self._classify(user_input)
+        return self._answer(user_input, context, classification)
+
+    def process_queries_batch(self, queries: List[str]) -> List[Tuple[str, QueryResult]]:
+        """Process several queries with one classification call and concurrent execution"""
+        if not queries:
+            return []
+
+        context = self.memory_manager.get_conversation_context()
+
         # Discover schema if not cached
         if not self.schema_manager.schema_cache:
             self.schema_manager.discover_schema()
 
+        # Only the queries the router can't place go to the LLM
+        router = self._get_router()
+        classifications = [router.route(query).classification for query in queries]
+        unrouted = [i for i, c in enumerate(classifications) if c is None]
+        if unrouted:
+            llm_classifications = self.nlp.classify_queries(
+                [queries[i] for i in unrouted], self.schema_manager.schema_cache
+            )
+            for i, classification in zip(unrouted, llm_classifications):
+                classifications[i] = classification
+        query_dicts = [self.query_executor.translate_to_mongodb_query(c) for c in classifications]
+
+        with ThreadPoolExecutor(max_workers=min(8, len(query_dicts))) as pool:
+            query_results = list(pool.map(self.query_executor.execute_query, query_dicts))
+
+        # Memory is updated afterwards, in the original order
+        responses = []
+        for query, classification, query_result in zip(queries, classifications, query_results):
+            response = self._generate_response(query, classification, query_result, context)
+            self.memory_manager.add_exchange(query, response, query_result)
+            responses.append((response, query_result))
+
+        return responses
+
+    def process_query_stream(self, user_input: str) -> Iterator[str]:
+        """Like process_query, but yields text as soon as each step has something to show
+
+        A short status line goes out right after classification, then the answer.
+        The last chunk is always the complete answer on its own (status lines are
+        progress only), and the QueryResult is left in self.last_result once the
+        generator is exhausted.
+        """
+        context = self.memory_manager.get_conversation_context()
+
+        classification = self._classify(user_input)
+        collection = classification.get("collection")
+        if collection and collection != "unknown":
+            yield f"_Looking in the {collection} collection..._\n\n"
+
+        response, self.last_result = self._answer(user_input, context, classification)
+        yield response
+
+    def _classify(self, user_input: str) -> Dict[str, Any]:
+        """Classify the query, by regex for the common shapes and by the LLM otherwise"""
+
+        # Discover schema if not cached
+        if not self.schema_manager.schema_cache:
+            self.schema_manager.discover_schema()
+
+        # Common question shapes are classified by regex, no LLM round trip at all
+        route = self._get_router().route(user_input)
+        if route.kind == "fast":
+            logger.info(f"Fast-routed query classification: {route.classification}")
+            return route.classification
+
         # Classify the query
         classification = self.nlp.classify_query(
             user_input, 
@@ -498,6 +979,20 @@ class ConversationalDatabaseAgent:
         )
 
         logger.info(f"Query classification: {classification}")
+        return classification
+
+    def _get_router(self) -> QueryRouter:
+        """Router for the current schema, built on first use"""
+        if self._router is None:
+            self._router = QueryRouter(self.schema_manager.schema_cache or SAMPLE_ANALYTICS_SCHEMA)
+        return self._router
+
+    def _reset_router(self):
+        """Drop the router so the next query rebuilds it from the rediscovered schema"""
+        self._router = None
+
+    def _answer(self, user_input: str, context: str, classification: Dict[str, Any]) -> Tuple[str, QueryResult]:
+        """Run the classified query, phrase the response and record the exchange"""
 
         # Translate to MongoDB query
         query_dict = self.query_executor.translate_to_mongodb_query(classification)
@@ -520,6 +1015,11 @@ class ConversationalDatabaseAgent:
         if not query_result.success:
             return f"I encountered an error: {query_result.error_message}. Could you please rephrase your question?"
 
+        # Phrasing came back with the classification, so no second LLM call is needed
+        templated = self._fill_response_template(classification, query_result)
+        if templated:
+            return templated
+
         if classification["query_type"] == "definition":
             data = query_result.data
             return f"The {classification['collection']} collection {data['definition']}. It contains fields like: {', '.join(data['fields'].keys())}."
@@ -533,40 +1033,88 @@ class ConversationalDatabaseAgent:
             if count == 0:
                 return "I didn't find any records matching your criteria."
             elif count == 1:
-                return f"I found 1 record. Here's the information: {self._format_document(query_result.data[0])}"
+                return f"I found 1 record. Here's the information: {self._format_document(query_result.data[0], classification.get('collection'))}"
             else:
-                return f"I found {count} records. Here are some examples: {self._format_documents(query_result.data[:3])}"
+                return f"I found {count} records. Here are some examples: {self._format_documents(query_result.data[:3], classification.get('collection'))}"
 
         elif classification["query_type"] == "aggregation":
             if query_result.data and len(query_result.data) > 0:
                 result = query_result.data[0]
+                metrics = {k: v for k, v in result.items() if k != "_id"}
                 if "result" in result:
                     return f"The result is: {result['result']}"
+                elif len(metrics) > 1:
+                    return "The results are: " + ", ".join(f"{metric}: {value}" for metric, value in metrics.items())
                 elif "count" in result:
                     return f"The count is: {result['count']}"
             return "I calculated the result but couldn't format it properly."
 
         return f"I processed your query and found {query_result.count} results."
 
-    def _format_document(self, doc: Dict) -> str:
-        """Format a single document for display"""
-        formatted = []
-        for key, value in doc.items():
-            if key != "_id":
-                if isinstance(value, list) and len(value) > 3:
+    def _fill_response_template(self, classification: Dict, query_result: QueryResult) -> Optional[str]:
+        """Fill the LLM-provided response template for count/aggregation answers"""
+        template = classification.get("response_template")
+        if not template or classification.get("query_type") not in ("count", "aggregation"):
+            return None
+
+        values = {}
+        if classification["query_type"] == "count":
+            values["count"] = query_result.count
+            if isinstance(query_result.data, dict):
+                values["count"] = query_result.data.get("count", query_result.count)
+        elif query_result.data:
+            # For aggregations query_result.count is the number of result rows, not of
+            # matching records, so $count is only bound when the pipeline produced one
+            first = query_result.data[0]
+            if "count" in first:
+                values["count"] = first["count"]
+            if "result" in first:
+                values["result"] = first["result"]
+            elif set(first) - {"_id"} == {"count"}:
+                values["result"] = first["count"]
+
+        # Missing placeholders stay as-is, in which case the deterministic formatter is safer
+        filled = Template(str(template)).safe_substitute(values)
+        return None if "$" in filled else filled
+
+    def _get_formatter(self, collection_name: Optional[str]) -> Callable[[Dict], str]:
+        """Build (once per collection) a formatter that knows which fields are arrays"""
+        formatter = self._formatters.get(collection_name)
+        if formatter is not None:
+            return formatter
+
+        list_fields = self.schema_manager.get_list_fields(collection_name) if self.schema_manager else frozenset()
+
+        def formatter(doc: Dict) -> str:
+            formatted = []
+            for key, value in doc.items():
+                if key == "_id":
+                    continue
+                # Only fields the schema says are arrays need the truncation check
+                if key in list_fields and isinstance(value, list) and len(value) > 3:
                     formatted.append(f"{key}: {value[:3]} (and {len(value)-3} more)")
                 else:
                     formatted.append(f"{key}: {value}")
-        return " | ".join(formatted[:5])
+                if len(formatted) == 5:
+                    break
+            return " | ".join(formatted)
+
+        self._formatters[collection_name] = formatter
+        return formatter
+
+    def _format_document(self, doc: Dict, collection_name: Optional[str] = None) -> str:
+        """Format a single document for display"""
+        return self._get_formatter(collection_name)(doc)
 
-    def _format_documents(self, docs: List[Dict]) -> str:
+    def _format_documents(self, docs: List[Dict], collection_name: Optional[str] = None) -> str:
         """Format multiple documents for display"""
-        return "\n".join([f"• {self._format_document(doc)}" for doc in docs])
+        formatter = self._get_formatter(collection_name)
+        return "\n".join([f"• {formatter(doc)}" for doc in docs])
 
     def get_insights(self) -> ConversationInsight:
         """Get insights from current conversation"""
         return self.insight_extractor.extract_insights(
-            self.memory_manager.conversation_log,
+            list(self.memory_manager.conversation_log),
             []  #here we could include query results if needed
         )
 
@@ -576,7 +1124,7 @@ class ConversationalDatabaseAgent:
 
     def disconnect(self):
         """Disconnect from database"""
-        if self.client:
+        if self.client and self._owns_client:
             self.client.close()
             logger.info(" Disconnected from MongoDB")
 
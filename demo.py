@@ -3,11 +3,57 @@ Demo Script for Conversational Database Agent
 Runs predefined queries to demonstrate the agent's capabilities
 """
 
+import io
+import sys
 import time
-import json
 from typing import List, Dict
 from database_agent import ConversationalDatabaseAgent
 from config import config
+from router import mock_response
+
+DEMO_QUERIES = (
+    "What is the accounts collection?",
+    "How many customers do we have?",
+    "Show me information about customer accounts",
+    "What's the average account limit?",
+    "How many accounts have InvestmentStock products?",
+    "Find customers with high account limits",
+    "What products are available in the accounts?",
+    "Show me recent customer information"
+)
+
+# Schema used when MongoDB isn't reachable, built once instead of on every run
+MOCK_SCHEMA = {
+    "accounts": {
+        "document_count": 1746,
+        "fields": {
+            "_id": {"type": "ObjectId"},
+            "account_id": {"type": "int"},
+            "limit": {"type": "int"},
+            "products": {"type": "list"}
+        }
+    },
+    "customers": {
+        "document_count": 500,
+        "fields": {
+            "_id": {"type": "ObjectId"},
+            "username": {"type": "str"},
+            "name": {"type": "str"},
+            "email": {"type": "str"},
+            "accounts": {"type": "list"}
+        }
+    },
+    "transactions": {
+        "document_count": 1746,
+        "fields": {
+            "_id": {"type": "ObjectId"},
+            "account_id": {"type": "int"},
+            "transaction_count": {"type": "int"},
+            "bucket_start_date": {"type": "datetime"},
+            "transactions": {"type": "list"}
+        }
+    }
+}
 
 class AgentDemo:
     """Demonstrates the agent with predefined scenarios"""
@@ -15,55 +61,25 @@ class AgentDemo:
     def __init__(self, use_mock_data: bool = False):
         self.agent = ConversationalDatabaseAgent()
         self.use_mock_data = use_mock_data
-        self.demo_queries = [
-            "What is the accounts collection?",
-            "How many customers do we have?",
-            "Show me information about customer accounts",
-            "What's the average account limit?",
-            "How many accounts have InvestmentStock products?",
-            "Find customers with high account limits",
-            "What products are available in the accounts?",
-            "Show me recent customer information"
-        ]
+        self.demo_queries = DEMO_QUERIES
+        # Output is collected here and written out in one go by _flush()
+        self._buf = io.StringIO()
+
+    def _p(self, *args):
+        """print() into the output buffer"""
+        print(*args, file=self._buf)
+
+    def _flush(self):
+        """Write everything buffered so far to stdout with a single call"""
+        sys.stdout.write(self._buf.getvalue())
+        sys.stdout.flush()
+        self._buf = io.StringIO()
 
     def setup_mock_data(self):
         """Setup mock data for testing when MongoDB is not available"""
 
-        mock_schema = {
-            "accounts": {
-                "document_count": 1746,
-                "fields": {
-                    "_id": {"type": "ObjectId"},
-                    "account_id": {"type": "int"},
-                    "limit": {"type": "int"},
-                    "products": {"type": "list"}
-                }
-            },
-            "customers": {
-                "document_count": 500,
-                "fields": {
-                    "_id": {"type": "ObjectId"},
-                    "username": {"type": "str"},
-                    "name": {"type": "str"},
-                    "email": {"type": "str"},
-                    "accounts": {"type": "list"}
-                }
-            },
-            "transactions": {
-                "document_count": 1746,
-                "fields": {
-                    "_id": {"type": "ObjectId"},
-                    "account_id": {"type": "int"},
-                    "transaction_count": {"type": "int"},
-                    "bucket_start_date": {"type": "datetime"},
-                    "transactions": {"type": "list"}
-                }
-            }
-        }
-
-        
         if self.agent.schema_manager:
-            self.agent.schema_manager.schema_cache = mock_schema
+            self.agent.schema_manager.schema_cache = MOCK_SCHEMA
 
     def run_demo(self):
         """Run the complete demo"""
@@ -72,26 +88,30 @@ class AgentDemo:
 
         
         if self.use_mock_data:
-            print(" Using mock data for demonstration")
+            self._p(" Using mock data for demonstration")
             self.agent.schema_manager = type('MockSchema', (), {})()
             self.setup_mock_data()
             connected = True
         else:
-            print("✅ Connecting to MongoDB...")
+            self._p("✅ Connecting to MongoDB...")
+            self._flush()  # live run: show progress before the slow parts
             connected = self.agent.connect_database()
 
         if not connected and not self.use_mock_data:
-            print("❌ Could not connect to database. Running with mock data...(check demo.py file to see the mock data)")
+            self._p("❌ Could not connect to database. Running with mock data...(check demo.py file to see the mock data)")
             self.use_mock_data = True
             self.setup_mock_data()
 
-        print("✅ Ready to demonstrate!")
-        print("-" * 60)
+        self._p("✅ Ready to demonstrate!")
+        self._p("-" * 60)
 
     
-        for i, query in enumerate(self.demo_queries, 1):
-            self.run_demo_query(i, query)
-            time.sleep(1)  # Brief pause between queries
+        if self.use_mock_data:
+            self.run_demo_mock()
+        else:
+            self._flush()
+            self.run_demo_batch()
+            self._flush()
 
         
         self.show_demo_insights()
@@ -101,138 +121,116 @@ class AgentDemo:
             self.agent.disconnect()
 
         self.display_footer()
+        self._flush()
 
     def display_header(self):
         """Display demo header"""
-        print(" " + "=" * 58 + " ")
-        print("           CONVERSATIONAL DATABASE AGENT DEMO")
-        print(" " + "=" * 58 + " ")
-        print()
-        print("This demo will show the agent's capabilities:")
-        print("• Natural language query processing")
-        print("• Schema understanding")
-        print("• Query classification and execution")
-        print("• Conversation memory")
-        print("• Insight extraction")
-        print()
-
-    def run_demo_query(self, query_num: int, query: str):
-        """Run a single demo query"""
-
-        print(f"\n Query {query_num}: {query}")
-        print("-" * 40)
+        self._p(" " + "=" * 58 + " ")
+        self._p("           CONVERSATIONAL DATABASE AGENT DEMO")
+        self._p(" " + "=" * 58 + " ")
+        self._p()
+        self._p("This demo will show the agent's capabilities:")
+        self._p("• Natural language query processing")
+        self._p("• Schema understanding")
+        self._p("• Query classification and execution")
+        self._p("• Conversation memory")
+        self._p("• Insight extraction")
+        self._p()
+
+    def run_demo_mock(self):
+        """Run the mock queries and print them in order"""
 
-        try:
-            if self.use_mock_data:
-                
-                response = self.generate_mock_response(query)
-                print(f" Response: {response}")
-               
-                time.sleep(0.5)
+        for i, query in enumerate(self.demo_queries, 1):
+            response = self.generate_mock_response(query)
+            self._p(f"\n Query {i}: {query}")
+            self._p("-" * 40)
+            self._p(f" Response: {response}")
+            self._p(f"✅ Query processed successfully")
 
-                print(f"✅ Query processed successfully")
+    def run_demo_batch(self):
+        """Run every demo query through one batched agent call, then print in order"""
 
+        start_time = time.time()
+        try:
+            responses = self.agent.process_queries_batch(self.demo_queries)
+        except Exception as e:
+            self._p(f"❌ Error processing queries: {e}")
+            return
+        execution_time = time.time() - start_time
+
+        for i, (query, (response, result)) in enumerate(zip(self.demo_queries, responses), 1):
+            self._p(f"\n Query {i}: {query}")
+            self._p("-" * 40)
+            self._p(f" Response: {response}")
+
+            if result.success:
+                self._p(f"✅ Query executed successfully")
+                self._p(f" Results: {result.count} items")
+                self._p(f"  Execution time: {result.execution_time_ms:.2f}ms")
             else:
-                
-                start_time = time.time()
-                #start_time=time.time()
-                response, result = self.agent.process_query(query)
+                self._p(f"❌ Query failed: {result.error_message}")
 
-                execution_time = time.time() - start_time
+        self._p(f"\n  Total time for {len(self.demo_queries)} queries: {execution_time:.2f}s")
 
-                print(f" Response: {response}")
-
-                if result.success:
-                    print(f"✅ Query executed successfully")
-                    print(f" Results: {result.count} items")
-                    print(f"  Execution time: {execution_time:.2f}s")
-                else:
-                    print(f"❌ Query failed: {result.error_message}")
-
-        except Exception as e:
-            print(f"❌ Error processing query: {e}")
-
-    def generate_mock_response(self, query: str) -> str:#I did use AI to generate the mock responses here!
+    def generate_mock_response(self, query: str) -> str:
         """Generate mock responses for demo purposes"""
-
-        query_lower = query.lower()
-
-        if "what is" in query_lower and "collection" in query_lower:
-            return "The accounts collection contains customer account information including credit limits and financial products like InvestmentStock, CurrencyService, and Derivatives."
-
-        elif "how many customers" in query_lower:
-            return "I found 500 customers in the database."
-
-        elif "average" in query_lower and "limit" in query_lower:
-            return "The average account limit is $9,124.32 across all accounts."
-
-        elif "investmentstock" in query_lower:
-            return "I found 348 accounts that have InvestmentStock products."
-
-        elif "high" in query_lower and "limit" in query_lower:
-            return "I found 23 customers with account limits above $15,000. Here are some examples: John Smith (limit: $18,500), Sarah Johnson (limit: $22,100)."
-
-        elif "products" in query_lower:
-            return "The available products include: InvestmentStock, CurrencyService, Derivatives, Commodity, and Brokerage services."
-
-        elif "recent" in query_lower:
-            return "Here are some recent customers: Alice Williams (joined last month), Bob Chen (account opened 2 weeks ago), Carol Davis (updated profile yesterday)."
-
-        else:
-            return "I processed your query and found relevant information in the database."
+        response = mock_response(query)
+        if response is not None:
+            return response
+        return "I processed your query and found relevant information in the database."
 
     def show_demo_insights(self):
         """Show conversation insights"""
 
-        print("\n" + "=" * 60)
-        print(" CONVERSATION INSIGHTS")
-        print("=" * 60)
+        self._p("\n" + "=" * 60)
+        self._p(" CONVERSATION INSIGHTS")
+        self._p("=" * 60)
 
         if self.use_mock_data:
             # Mock insights
-            print(" User Intent: Exploring database structure and querying financial data")
-            print("Emotional Tone: Curious and engaged")
-            print(" Data Gaps Identified:")
-            print("   • User might want to see specific customer details")
-            print("   • Transaction analysis could be valuable")
-            print("   • Product performance metrics are missing")
-            print(" Suggested Follow-up Questions:")
-            print("   • What are the most popular products?")
-            print("   • Show me transaction patterns over time")
-            print("   • Find customers with the highest transaction volumes")
+            self._p(" User Intent: Exploring database structure and querying financial data")
+            self._p("Emotional Tone: Curious and engaged")
+            self._p(" Data Gaps Identified:")
+            self._p("   • User might want to see specific customer details")
+            self._p("   • Transaction analysis could be valuable")
+            self._p("   • Product performance metrics are missing")
+            self._p(" Suggested Follow-up Questions:")
+            self._p("   • What are the most popular products?")
+            self._p("   • Show me transaction patterns over time")
+            self._p("   • Find customers with the highest transaction volumes")
         else:
             try:
                 insights = self.agent.get_insights()
-                print(f" User Intent: {insights.user_intent}")
-                print(f" Emotional Tone: {insights.emotional_tone}")
+                self._p(f" User Intent: {insights.user_intent}")
+                self._p(f" Emotional Tone: {insights.emotional_tone}")
 
                 if insights.data_gaps:
-                    print("🔍 Data Gaps:")
+                    self._p("🔍 Data Gaps:")
                     for gap in insights.data_gaps:
-                        print(f"   • {gap}")
+                        self._p(f"   • {gap}")
 
                 if insights.suggested_queries:
-                    print(" Suggested Questions:")
+                    self._p(" Suggested Questions:")
                     for suggestion in insights.suggested_queries:
-                        print(f"   • {suggestion}")
+                        self._p(f"   • {suggestion}")
             except Exception as e:
-                print(f"Could not extract insights: {e}")
+                self._p(f"Could not extract insights: {e}")
 
     def display_footer(self):
         """Display demo footer"""
 
-        print("\n" + "=" * 60)
-        print(" DEMO COMPLETED!")
-        print("=" * 60)
-        print("The Conversational Database Agent demonstrated:")
-        print("✅ Natural language understanding")
-        print("✅ MongoDB query translation")
-        print("✅ Conversation memory")
-        print("✅ Insight extraction")
-        print("✅ Error handling")
-        print()
-        print("Ready for production use! 🚀")
-        print("=" * 60)
+        self._p("\n" + "=" * 60)
+        self._p(" DEMO COMPLETED!")
+        self._p("=" * 60)
+        self._p("The Conversational Database Agent demonstrated:")
+        self._p("✅ Natural language understanding")
+        self._p("✅ MongoDB query translation")
+        self._p("✅ Conversation memory")
+        self._p("✅ Insight extraction")
+        self._p("✅ Error handling")
+        self._p()
+        self._p("Ready for production use! 🚀")
+        self._p("=" * 60)
 
 def run_interactive_demo():
     """Run an interactive demo where user can choose queries"""
@@ -275,8 +273,6 @@ def run_interactive_demo():
 def main():
     """Main entry point"""
 
-    import sys
-
     if len(sys.argv) > 1:
         if sys.argv[1] == '--mock':
             # Run with mock data
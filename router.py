@@ -0,0 +1,117 @@
+"""
+Query Router for Conversational Database Agent
+Cheap regex checks that send trivial questions around the LLM classification step
+"""
+
+import re
+from typing import Any, Dict, Mapping, NamedTuple, Optional, Tuple
+
+class Route(NamedTuple):
+    """Where a query should go: "fast" (classification already known) or "full" (ask the LLM)"""
+    kind: str
+    classification: Optional[Dict[str, Any]] = None
+
+FULL_ROUTE = Route("full")
+
+# Whole-question patterns only, anything with extra conditions goes through the LLM
+_DEFINITION_PATTERN = re.compile(r"^\s*what(?:\s+is|'s)\s+the\s+(\w+)\s+collection\s*\??\s*$", re.I)
+_COUNT_PATTERN = re.compile(
+    r"^\s*how\s+many\s+(\w+)(?:\s+(?:do\s+we\s+have|are\s+there))?(?:\s+in\s+the\s+database)?\s*\??\s*$",
+    re.I
+)
+
+# Mock answers for the demo, first matching pattern wins (I did use AI to generate the mock responses here!)
+MOCK_RULES = [
+    (re.compile(r"what is.*collection|collection.*what is", re.I),
+     "The accounts collection contains customer account information including credit limits and financial products like InvestmentStock, CurrencyService, and Derivatives."),
+    (re.compile(r"how many customers", re.I),
+     "I found 500 customers in the database."),
+    (re.compile(r"average.*limit|limit.*average", re.I),
+     "The average account limit is $9,124.32 across all accounts."),
+    (re.compile(r"investmentstock", re.I),
+     "I found 348 accounts that have InvestmentStock products."),
+    (re.compile(r"high.*limit|limit.*high", re.I),
+     "I found 23 customers with account limits above $15,000. Here are some examples: John Smith (limit: $18,500), Sarah Johnson (limit: $22,100)."),
+    (re.compile(r"products", re.I),
+     "The available products include: InvestmentStock, CurrencyService, Derivatives, Commodity, and Brokerage services."),
+    (re.compile(r"recent", re.I),
+     "Here are some recent customers: Alice Williams (joined last month), Bob Chen (account opened 2 weeks ago), Carol Davis (updated profile yesterday)."),
+]
+
+def mock_response(query: str) -> Optional[str]:
+    """Canned answer for the mock demo, or None if no rule matches"""
+    for pattern, response in MOCK_RULES:
+        if pattern.search(query):
+            return response
+    return None
+
+# Wording for aggregation_type in "what's the average account limit?" style questions
+_AGGREGATION_WORDS = {
+    "average": "avg", "avg": "avg", "mean": "avg",
+    "total": "sum", "sum": "sum",
+    "max": "max", "maximum": "max", "highest": "max", "largest": "max",
+    "min": "min", "minimum": "min", "lowest": "min", "smallest": "min",
+}
+
+_AGGREGATION_PATTERN = re.compile(
+    r"^\s*what(?:\s+is|'s)\s+the\s+(" + "|".join(_AGGREGATION_WORDS) + r")\s+(\w+)\s+(\w+)\s*\??\s*$",
+    re.I
+)
+
+# BSON type names from discovery plus the python-ish ones in the static/mock schemas
+NUMERIC_TYPES = frozenset({"int", "long", "double", "decimal", "float"})
+
+class QueryRouter:
+    """Classifications for the common question shapes, worked out once per schema"""
+
+    def __init__(self, schema: Mapping[str, Any]):
+        # word used in a question -> collection ("customer" and "customers" both work)
+        self._collections: Dict[str, str] = {}
+        self._definitions: Dict[str, Dict[str, Any]] = {}
+        self._counts: Dict[str, Dict[str, Any]] = {}
+        # (collection, lowercased field, aggregation_type) -> classification
+        self._aggregations: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+
+        for name, info in schema.items():
+            self._collections[name.lower()] = name
+            if name.endswith("s"):
+                self._collections[name[:-1].lower()] = name
+
+            self._definitions[name] = {"query_type": "definition", "collection": name}
+            self._counts[name] = {"query_type": "count", "collection": name, "filters": {}}
+
+            fields = info.get("fields", {}) if isinstance(info, Mapping) else {}
+            for field, field_info in fields.items():
+                if field_info.get("type") not in NUMERIC_TYPES:
+                    continue
+                for agg_type in set(_AGGREGATION_WORDS.values()):
+                    self._aggregations[(name, field.lower(), agg_type)] = {
+                        "query_type": "aggregation",
+                        "collection": name,
+                        "aggregation_type": agg_type,
+                        "extracted_fields": [field],
+                        "filters": {}
+                    }
+
+    def route(self, query: str) -> Route:
+        """Classify trivial definition/count/aggregation questions without calling the LLM"""
+        match = _DEFINITION_PATTERN.match(query)
+        if match:
+            collection = self._collections.get(match.group(1).lower())
+            if collection:
+                return Route("fast", dict(self._definitions[collection]))
+
+        match = _COUNT_PATTERN.match(query)
+        if match:
+            collection = self._collections.get(match.group(1).lower())
+            if collection:
+                return Route("fast", dict(self._counts[collection]))
+
+        match = _AGGREGATION_PATTERN.match(query)
+        if match:
+            collection = self._collections.get(match.group(2).lower())
+            key = (collection, match.group(3).lower(), _AGGREGATION_WORDS[match.group(1).lower()])
+            if key in self._aggregations:
+                return Route("fast", dict(self._aggregations[key]))
+
+        return FULL_ROUTE
@@ -5,9 +5,8 @@ Provides a user-friendly chat interface for interacting with the database
 
 import streamlit as st
 import time
-import json
-from datetime import datetime
-from typing import Dict, List, Any
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional
 
 
 st.set_page_config(
@@ -16,17 +15,61 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-try:
-    from database_agent import ConversationalDatabaseAgent
-    from config import config, SAMPLE_ANALYTICS_SCHEMA
-except ImportError:
-    st.error("Please make sure all required modules are installed. Run: pip install -r requirements.txt")
-    st.stop()
+# One connection pool for the whole server process. The script reruns on every
+# interaction, so the client has to live in cache_resource, not at module level
+# (pool sizes come from MONGODB_MAX_POOL_SIZE / MONGODB_MIN_POOL_SIZE)
+MONGO_POOL_OPTIONS = {
+    "maxIdleTimeMS": 30000,
+    "waitQueueTimeoutMS": 10000,
+    "retryWrites": True,
+    "readPreference": "primary",
+}
+
+# Some examples taken from AI to test
+_EXAMPLE_QUERIES = (
+    "What is the accounts collection?",
+    "How many customers do we have?",
+    "Show me customer information",
+    "What's the average account limit?",
+    "Find accounts with InvestmentStock",
+    "What products are available?"
+)
+
+# Answers remembered per session, keyed by (normalized query, schema version)
+QUERY_CACHE_SIZE = 128
+
+def _config():
+    """The global config, imported on first use"""
+    from config import config
+    return config
 
 @st.cache_resource
+def get_mongo_client():
+    """Create the pooled MongoClient shared by every session"""
+    from pymongo import MongoClient
+
+    config = _config()
+    return MongoClient(
+        config.database.connection_string,
+        serverSelectionTimeoutMS=config.database.timeout_ms,
+        maxPoolSize=config.database.max_pool_size,
+        minPoolSize=config.database.min_pool_size,
+        appname="ConversationalDatabaseAgent",
+        **MONGO_POOL_OPTIONS
+    )
+
 def get_agent():
-    """Initialize and cache the database agent"""
-    agent = ConversationalDatabaseAgent()
+    """Initialize a database agent for this session on top of the shared client"""
+    # pymongo/openai/langchain only get imported here, so the page can start
+    # rendering before they're loaded
+    try:
+        from database_agent import ConversationalDatabaseAgent
+    except ImportError:
+        st.error("Please make sure all required modules are installed. Run: pip install -r requirements.txt")
+        st.stop()
+
+    # Conversation memory is per agent, so each session gets its own agent
+    agent = ConversationalDatabaseAgent(client=get_mongo_client())
 
     if agent.connect_database():
         return agent
@@ -36,28 +79,53 @@ def get_agent():
 def initialize_session_state():
     """Initialize Streamlit session state variables"""
 
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
-
-    if "agent" not in st.session_state:
-        st.session_state.agent = get_agent()
+    # Chat history as parallel lists (role, content, extra info) rather than one dict per message
+    if "roles" not in st.session_state:
+        st.session_state.roles = []
+        st.session_state.contents = []
+        st.session_state.metas = []
 
     if "query_count" not in st.session_state:
         st.session_state.query_count = 0
 
-    if "session_start_time" not in st.session_state:
-        st.session_state.session_start_time = datetime.now()
+    if "query_cache" not in st.session_state:
+        st.session_state.query_cache = OrderedDict()
+
+    if "session_start_monotonic" not in st.session_state:
+        st.session_state.session_start_monotonic = time.monotonic()
+
+def render_shell():
+    """Title and sidebar heading, drawn before the agent (and pymongo/openai) is loaded"""
+    st.sidebar.title("🤖 Database Agent")
+    st.title("Conversational Database Agent")
+    st.markdown("Chat with your MongoDB database using natural language!")
+
+def ensure_agent():
+    """Build this session's agent on the first run (the heavy imports happen here)"""
+    if "agent" not in st.session_state:
+        with st.spinner("Connecting to database..."):
+            st.session_state.agent = get_agent()
+
+def add_message(role: str, content: str, meta: Optional[Dict] = None):
+    """Append a message to the chat history"""
+    st.session_state.roles.append(role)
+    st.session_state.contents.append(content)
+    st.session_state.metas.append(meta)
+
+def clear_messages():
+    """Empty the chat history"""
+    st.session_state.roles.clear()
+    st.session_state.contents.clear()
+    st.session_state.metas.clear()
 
 def render_sidebar():
     """Render the sidebar with app information and controls"""
 
     with st.sidebar:
-        st.title("🤖 Database Agent")
-
         ##
         if st.session_state.agent:
             st.success("✅ Connected to MongoDB")
-            st.info(f"Database: {config.database.database_name}")
+            st.info(f"Database: {_config().database.database_name}")
         else:
             st.error("❌ Database connection failed")
             st.warning("Check your .env configuration")
@@ -66,26 +134,16 @@ def render_sidebar():
 
         ##
         st.subheader("📊 Session Stats")
-        session_duration = datetime.now() - st.session_state.session_start_time
-        st.metric("Duration", f"{session_duration.total_seconds():.0f}s")
+        session_duration = time.monotonic() - st.session_state.session_start_monotonic
+        st.metric("Duration", f"{session_duration:.0f}s")
         st.metric("Queries", st.session_state.query_count)
-        st.metric("Messages", len(st.session_state.messages))
+        st.metric("Messages", len(st.session_state.roles))
 
         st.divider()
 
-        # Some examples taken from AI to test
         st.subheader(" Example Queries")
-        example_queries = [
-            "What is the accounts collection?",
-            "How many customers do we have?",
-            "Show me customer information",
-            "What's the average account limit?",
-            "Find accounts with InvestmentStock",
-            "What products are available?"
-        ]
-
-        for query in example_queries:
-            if st.button(query, key=f"example_{query}", use_container_width=True):
+        for i, query in enumerate(_EXAMPLE_QUERIES):
+            if st.button(query, key=f"ex_{i}", use_container_width=True):
                 st.session_state.pending_query = query
                 st.rerun()
 
@@ -95,7 +153,8 @@ def render_sidebar():
         st.subheader(" Controls")
 
         if st.button(" Clear Chat", use_container_width=True):
-            st.session_state.messages = []
+            clear_messages()
+            st.session_state.query_cache.clear()
             if st.session_state.agent:
                 st.session_state.agent.reset_conversation()
             st.rerun()
@@ -108,6 +167,33 @@ def render_sidebar():
             st.session_state.show_schema = True
             st.rerun()
 
+        if st.session_state.agent and st.button(" Refresh Schema", use_container_width=True):
+            # Schema is normally loaded from the disk cache, this forces a rediscovery
+            with st.spinner("Rediscovering schema..."):
+                st.session_state.agent.schema_manager.refresh_schema()
+            st.session_state.query_cache.clear()
+            st.session_state.show_schema = True
+            st.rerun()
+
+def get_field_table(collection_name: str, fields: Dict[str, Any]):
+    """Field/type/sample table for one collection, built once per schema version"""
+    version = st.session_state.agent.schema_manager.schema_version
+    tables = st.session_state.setdefault("field_tables", {})
+    key = (collection_name, version)
+
+    # Tables from an older schema version will never be shown again
+    stale = [k for k in tables if k[1] != version]
+    for k in stale:
+        del tables[k]
+
+    if key not in tables:
+        import pandas as pd  # ships with streamlit
+
+        rows = [(name, info.get('type', 'unknown'), str(info.get('sample_value', ''))[:50])
+                for name, info in fields.items()]
+        tables[key] = pd.DataFrame.from_records(rows, columns=["Field", "Type", "Sample"])
+    return tables[key]
+
 def render_schema_info():
     """Render database schema information"""
 
@@ -136,15 +222,7 @@ def render_schema_info():
                 fields = info.get('fields', {})
                 if fields:
                     st.write("**Fields:**")
-                    field_data = []
-                    for field_name, field_info in fields.items():
-                        field_data.append({
-                            "Field": field_name,
-                            "Type": field_info.get('type', 'unknown'),
-                            "Sample": str(field_info.get('sample_value', ''))[:50]
-                        })
-
-                    st.dataframe(field_data, use_container_width=True)
+                    st.dataframe(get_field_table(collection_name, fields), use_container_width=True)
     else:
         st.warning("No schema information available")
 
@@ -189,9 +267,12 @@ def render_chat_message(role: str, content: str, extra_info: Dict = None):
     with st.chat_message(role):
         st.markdown(content)
 
-        if extra_info and config.agent.debug_mode:
+        # Callers only pass extra_info when debug mode is on
+        if extra_info:
             with st.expander("Debug Info"):
-                st.json(extra_info)
+                # Pre-serialized with the agent's orjson-backed helper instead of st.json's own encoder
+                from database_agent import json_dumps
+                st.code(json_dumps(extra_info, indent=True), language="json")
 
 def process_user_query(query: str):
     """Process user query and display response"""
@@ -201,63 +282,75 @@ def process_user_query(query: str):
         return
 
   
-    st.session_state.messages.append({"role": "user", "content": query})
+    add_message("user", query)
     render_chat_message("user", query)
 
     
     with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
-            try:
-                start_time = time.time()
-                response, result = st.session_state.agent.process_query(query)
-                execution_time = time.time() - start_time
-
-                
+        try:
+            start_time = time.time()
+            cache = st.session_state.query_cache
+            key = (query.strip().lower(), st.session_state.agent.schema_manager.schema_version)
+
+            if key in cache:
+                # Same question against the same schema, e.g. an example button clicked twice
+                cache.move_to_end(key)
+                response, result = cache[key]
                 st.markdown(response)
-
-                # Show additional info if debug mode
-                if config.agent.debug_mode:
-                    with st.expander("Query Details"):
-                        col1, col2, col3, col4 = st.columns(4)
-                        with col1:
-                            st.metric("Query Type", result.query_type)
-                        with col2:
-                            st.metric("Success", "✅" if result.success else "❌")
-                        with col3:
-                            st.metric("Results", result.count)
-                        with col4:
-                            st.metric("Time (ms)", f"{result.execution_time_ms:.2f}")
-
-
-                st.session_state.messages.append({
-                    "role": "assistant",
-                    "content": response,
-                    "execution_time": execution_time,
-                    "result_count": result.count
-                })
-
-                st.session_state.query_count += 1
-
-            except Exception as e:
-                error_msg = f"Sorry, I encountered an error: {str(e)}"
-                st.error(error_msg)
-                st.session_state.messages.append({
-                    "role": "assistant",
-                    "content": error_msg
-                })
+                # Keep the agent's log/insights in step with the visible chat
+                st.session_state.agent.memory_manager.add_exchange(query, response, result)
+            else:
+                # The status line shows up right after classification instead of the whole
+                # answer appearing at once at the end (trivial questions are fast-routed
+                # inside the agent and skip the LLM). Each chunk replaces the previous one,
+                # so the status is transient and only the final answer is kept
+                placeholder = st.empty()
+                for response in st.session_state.agent.process_query_stream(query):
+                    placeholder.markdown(response)
+                result = st.session_state.agent.last_result
+                if result.success:
+                    cache[key] = (response, result)
+                    while len(cache) > QUERY_CACHE_SIZE:
+                        cache.popitem(last=False)
+            execution_time = time.time() - start_time
+
+            # Show additional info if debug mode
+            if _config().agent.debug_mode:
+                with st.expander("Query Details"):
+                    col1, col2, col3, col4 = st.columns(4)
+                    with col1:
+                        st.metric("Query Type", result.query_type)
+                    with col2:
+                        st.metric("Success", "✅" if result.success else "❌")
+                    with col3:
+                        st.metric("Results", result.count)
+                    with col4:
+                        st.metric("Time (ms)", f"{result.execution_time_ms:.2f}")
+
+
+            add_message("assistant", response, {
+                "execution_time": execution_time,
+                "result_count": result.count
+            })
+
+            st.session_state.query_count += 1
+
+        except Exception as e:
+            error_msg = f"Sorry, I encountered an error: {str(e)}"
+            st.error(error_msg)
+            add_message("assistant", error_msg)
 
 def render_main_chat():
     """Render the main chat interface"""
 
-    st.title("Conversational Database Agent")
-    st.markdown("Chat with your MongoDB database using natural language!")
-
     
-    for message in st.session_state.messages:
-        role = message["role"]
-        content = message["content"]
-        extra_info = {k: v for k, v in message.items() if k not in ["role", "content"]}
-        render_chat_message(role, content, extra_info if extra_info else None)
+    # Debug info is skipped wholesale in normal mode instead of being checked per message
+    if _config().agent.debug_mode:
+        for role, content, extra_info in zip(st.session_state.roles, st.session_state.contents, st.session_state.metas):
+            render_chat_message(role, content, extra_info)
+    else:
+        for role, content in zip(st.session_state.roles, st.session_state.contents):
+            render_chat_message(role, content)
 
     
     query = st.chat_input("Ask me anything about your database...")
@@ -267,9 +360,10 @@ def render_main_chat():
         query = st.session_state.pending_query
         del st.session_state.pending_query
 
+    # The new turn is drawn in place by process_user_query, so there's no need for
+    # a second full rerun just to show it
     if query:
         process_user_query(query)
-        st.rerun()
 
 def main():
     """Main Streamlit application"""
@@ -277,10 +371,12 @@ def main():
     
     initialize_session_state()
 
-    render_sidebar()
-
+    # Something is on screen before the agent's imports and connection run
+    render_shell()
+    ensure_agent()
 
     if "show_schema" in st.session_state and st.session_state.show_schema:
+        render_sidebar()
         render_schema_info()
         del st.session_state.show_schema
         if st.button("← Back to Chat"):
@@ -288,6 +384,7 @@ def main():
         return
 
     if "show_insights" in st.session_state and st.session_state.show_insights:
+        render_sidebar()
         render_insights()
         del st.session_state.show_insights
         if st.button("← Back to Chat"):
@@ -297,8 +394,12 @@ def main():
     
     render_main_chat()
 
+    # The sidebar goes to the same place whatever the call order; drawing it after
+    # the chat means its stats already include the turn that just ran
+    render_sidebar()
+
     # This shows welcome message if no messages at the starting
-    if not st.session_state.messages:
+    if not st.session_state.roles:
         st.info("👋 Welcome! Ask me anything about your database. Try queries like 'How many customers do we have?' or 'What is the accounts collection?'")
 
 if __name__ == "__main__":